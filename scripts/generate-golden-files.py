@@ -6,24 +6,40 @@ This script generates EXACT expected outputs that the C++ implementation
 must match. Any difference indicates a bug.
 
 Usage:
-    python scripts/generate-golden-files.py
+    python scripts/generate-golden-files.py [--only STAGE,...] [--skip-existing] [--force-rebuild]
+
+Stages: fft, filterbank, mel, onnx, particle_filter, e2e. --skip-existing
+skips stages whose outputs are newer than their inputs (audio, model, script).
+
+The mel stage caches full-length mel features in scripts/.golden-cache/ so
+the e2e stage can skip the madmom pipeline; pass --force-rebuild to discard
+them.
 
 Environment variables:
     BEATNET_SRC: Path to BeatNet source (default: ~/dev/BeatNet/src)
+    BEATNET_ORT_PROVIDERS: Comma-separated ONNX Runtime execution providers to
+        try before the CPU, e.g. CUDAExecutionProvider (default: CPU only, which
+        is what the C++ engine runs and what the goldens should match)
 
 Requirements:
-    pip install numpy librosa madmom
+    pip install numpy scipy orjson librosa madmom
 
 Output:
     packages/engine/tests/golden/*.json
 """
 
-import json
+import argparse
+import functools
 import os
+import shutil
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 import numpy as np
+import orjson
+import scipy
+import scipy.fft as sfft
 
 # Add BeatNet to path (configurable via BEATNET_SRC environment variable)
 BEATNET_SRC = os.path.abspath(
@@ -36,6 +52,8 @@ SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 GOLDEN_DIR = PROJECT_ROOT / "packages/engine/tests/golden"
 AUDIO_DIR = PROJECT_ROOT / "apps/native/assets/test"
+BEATNET_MODEL_PATH = PROJECT_ROOT / "apps/native/assets/models/beatnet_model_2.onnx"
+FEATURE_CACHE_DIR = SCRIPT_DIR / ".golden-cache"
 
 GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -45,29 +63,36 @@ SAMPLE_RATE = 22050
 HOP_SIZE = 441       # 20ms -> 50 FPS
 NUM_BANDS = 24       # Bands per octave
 
+# Resampler used when decoding test audio to SAMPLE_RATE. soxr's SIMD C
+# implementation is much faster than the kaiser_best filter older librosa
+# versions default to; it is recorded in the golden JSON so C++ can match.
+RES_TYPE = "soxr_hq"
 
-def save_json(data: dict, filename: str):
-    """Save data to JSON with high precision for floats."""
-    path = GOLDEN_DIR / filename
 
-    class HighPrecisionEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-            if isinstance(obj, np.floating):
-                return float(obj)
-            if isinstance(obj, np.integer):
-                return int(obj)
-            return super().default(obj)
+def _json_default(obj):
+    """Fallback for arrays orjson cannot serialize directly (views, subclasses)."""
+    if isinstance(obj, np.ndarray):
+        return np.ascontiguousarray(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
 
-    with open(path, "w") as f:
-        json.dump(data, f, cls=HighPrecisionEncoder, indent=2)
+
+def save_json(data: dict, filename: str, indent: bool = False):
+    """Save data to JSON, serializing numpy arrays and scalars natively.
+
+    Output is compact unless indent is set (2 spaces, the only width orjson
+    supports); reserve that for files meant to be read by hand.
+    """
+    path = GOLDEN_DIR / filename
+    option = orjson.OPT_SERIALIZE_NUMPY
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    path.write_bytes(orjson.dumps(data, default=_json_default, option=option))
 
     print(f"  Saved: {path}")
 
 
 def generate_fft_golden():
-    """Generate FFT test vectors using numpy.fft with 1411-point FFT."""
+    """Generate FFT test vectors using scipy.fft with 1411-point FFT."""
     print("\n=== Generating FFT Golden Files ===")
 
     # Use exact BeatNet config: 1411-point FFT
@@ -76,32 +101,41 @@ def generate_fft_golden():
 
     t = np.arange(fft_size) / sample_rate
     sine_440 = np.sin(2 * np.pi * 440 * t).astype(np.float32)
-    fft_result = np.fft.rfft(sine_440)
+    # Keep the exact 1411-point length (no next_fast_len padding) so the golden
+    # matches BeatNet. float32 input gives a single-precision transform, like
+    # the numpy.fft.rfft golden this replaced.
+    fft_result = sfft.rfft(sine_440, workers=-1)
+    magnitude = np.abs(fft_result)
+
+    # Unit impulse: flat magnitude spectrum
+    impulse = np.zeros(fft_size, dtype=np.float32)
+    impulse[0] = 1.0
 
     data = {
-        "description": "FFT golden files from numpy.fft.rfft (1411-point FFT matching BeatNet)",
+        "description": "FFT golden files from scipy.fft.rfft (1411-point FFT matching BeatNet)",
         "numpy_version": np.__version__,
+        "scipy_version": scipy.__version__,
         "fft_size": fft_size,
         "sample_rate": sample_rate,
         "test_cases": {
             "sine_440hz": {
                 "fft_size": fft_size,
                 "sample_rate": sample_rate,
-                "input": sine_440.tolist(),
-                "output_real": np.real(fft_result).tolist(),
-                "output_imag": np.imag(fft_result).tolist(),
-                "magnitude": np.abs(fft_result).tolist(),
-                "power": (np.abs(fft_result) ** 2).tolist(),
+                "input": sine_440,
+                "output_real": fft_result.real,
+                "output_imag": fft_result.imag,
+                "magnitude": magnitude,
+                "power": magnitude * magnitude,
             },
             "impulse": {
                 "fft_size": fft_size,
-                "input": [1.0] + [0.0] * (fft_size - 1),
-                "magnitude": [1.0] * (fft_size // 2 + 1),
+                "input": impulse,
+                "magnitude": np.ones(fft_size // 2 + 1, dtype=np.float32),
             },
         }
     }
 
-    save_json(data, "fft_golden.json")
+    save_json(data, "fft_golden.json", indent=True)
 
 
 def generate_filterbank_golden():
@@ -145,31 +179,241 @@ def generate_filterbank_golden():
     print(f"  Saved: {binary_path}")
 
 
+def _scipy_rfft_builder(fft_window, fft_size=None, axis=0, **kwargs):
+    """Stand-in for pyfftw's rfft builder, backed by scipy.fft (pocketfft)."""
+    return functools.partial(sfft.rfft, n=fft_size, axis=axis)
+
+
+def build_mel_pipeline():
+    """Create the exact BeatNet mel pipeline from log_spect.py."""
+    import madmom.audio.stft
+    from madmom.audio.signal import SignalProcessor, FramedSignalProcessor
+    from madmom.audio.stft import ShortTimeFourierTransformProcessor
+    from madmom.audio.spectrogram import (
+        FilteredSpectrogramProcessor,
+        LogarithmicSpectrogramProcessor,
+        SpectrogramDifferenceProcessor,
+    )
+    from madmom.processors import SequentialProcessor
+
+    # madmom's STFT runs a full complex scipy.fftpack.fft per frame unless
+    # pyfftw is installed, in which case it uses an rfft built by
+    # rfft_builder. Route that hook to scipy.fft.rfft so every frame takes the
+    # real-input pocketfft path. The kept bins [0, fft_size // 2) are the same
+    # either way (the pipeline drops the Nyquist bin).
+    madmom.audio.stft.rfft_builder = _scipy_rfft_builder
+
+    sig = SignalProcessor(num_channels=1, sample_rate=SAMPLE_RATE)
+    frames = FramedSignalProcessor(frame_size=FFT_SIZE, hop_size=HOP_SIZE)
+    stft = ShortTimeFourierTransformProcessor()
+    filt = FilteredSpectrogramProcessor(
+        num_bands=NUM_BANDS, fmin=30, fmax=17000, norm_filters=True
+    )
+    spec = LogarithmicSpectrogramProcessor(mul=1, add=1)
+    diff = SpectrogramDifferenceProcessor(
+        diff_ratio=0.5, positive_diffs=True, stack_diffs=np.hstack
+    )
+
+    return SequentialProcessor([sig, frames, stft, filt, spec, diff])
+
+
+def create_beatnet_session(model_path: Path, intra_op_num_threads: int = 1):
+    """Create an ONNX Runtime session for the BeatNet model."""
+    import onnxruntime as ort
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = intra_op_num_threads
+
+    # CPU by default: accelerators change the numerics (FP16, TF32) and the
+    # streaming model is per-frame, so they are opt-in and used only if present
+    available = ort.get_available_providers()
+    requested = os.environ.get("BEATNET_ORT_PROVIDERS", "")
+    providers = []
+    for p in (name.strip() for name in requested.split(",")):
+        if not p or p == "CPUExecutionProvider":
+            continue
+        if p in available:
+            providers.append(p)
+        else:
+            print(f"  WARNING: {p} is not available in this onnxruntime build, skipping it")
+    providers.append("CPUExecutionProvider")
+    return ort.InferenceSession(str(model_path), sess_options, providers=providers)
+
+
+# Per-process state for the worker pools. Each worker builds its mel
+# pipeline on first use and, in BeatNet pools, loads the ONNX session once in
+# the pool initializer, then reuses both for every file it is handed.
+# Sessions run single-threaded because the pool already spreads files across
+# all cores.
+_worker_mel_pipeline = None
+_worker_session = None
+
+
+def _mel_pipeline():
+    global _worker_mel_pipeline
+    if _worker_mel_pipeline is None:
+        _worker_mel_pipeline = build_mel_pipeline()
+    return _worker_mel_pipeline
+
+
+def _init_beatnet_worker(model_path: Path):
+    global _worker_session
+    _worker_session = create_beatnet_session(model_path)
+
+
+def _process_pool(num_tasks: int, initializer=None, initargs=()):
+    """Create a process pool sized for num_tasks independent files."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_workers = max(1, min(num_tasks, os.cpu_count() or 1))
+    return ProcessPoolExecutor(
+        max_workers=max_workers, initializer=initializer, initargs=initargs
+    )
+
+
+def beatnet_pool(num_tasks: int):
+    """Create a worker pool whose workers each hold a BeatNet ONNX session.
+
+    Pass it to generate_onnx_golden and generate_e2e_golden so both stages
+    share the sessions instead of parsing and optimizing the model twice.
+    Workers start lazily, so an unused pool never loads the model.
+    """
+    return _process_pool(num_tasks, _init_beatnet_worker, (BEATNET_MODEL_PATH,))
+
+
+def _is_fresh(path: Path, source: Path) -> bool:
+    """True if path exists and is newer than both its source and this script."""
+    if not path.exists():
+        return False
+    newest_input = max(source.stat().st_mtime, Path(__file__).stat().st_mtime)
+    return path.stat().st_mtime >= newest_input
+
+
+def _raw_audio_path(bpm_str: str) -> Path:
+    """Path of the decoded float32 audio written for the C++ tests."""
+    return GOLDEN_DIR.parent / "audio" / f"{bpm_str}.raw"
+
+
+def _load_audio(audio_file: Path, bpm_str: str) -> np.ndarray:
+    """Load mono SAMPLE_RATE audio, reusing the .raw file from the mel stage.
+
+    The .raw file is the librosa output dumped as float32, so reading it back
+    skips the AAC decode and resample. Falls back to librosa when it is
+    missing or older than the source audio or this script.
+    """
+    raw_path = _raw_audio_path(bpm_str)
+    if _is_fresh(raw_path, audio_file):
+        return np.fromfile(raw_path, dtype=np.float32)
+
+    import librosa
+    audio, sr = librosa.load(str(audio_file), sr=SAMPLE_RATE, mono=True, res_type=RES_TYPE)
+    return audio
+
+
+def _feature_cache_path(bpm_str: str) -> Path:
+    return FEATURE_CACHE_DIR / f"mel_features_{bpm_str}bpm.npy"
+
+
+def _save_cached_features(bpm_str: str, features: np.ndarray):
+    FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(_feature_cache_path(bpm_str), features, allow_pickle=False)
+
+
+def _load_or_compute_features(audio_file: Path, bpm_str: str) -> np.ndarray:
+    """Load full-length mel features from the cache, computing them on a miss.
+
+    The golden .bin files only keep the first 100 frames, so the mel stage
+    caches the full feature matrix for the e2e stage. A cache entry older than
+    its audio file or this script is treated as stale. Must be called from a
+    worker (uses its mel pipeline).
+    """
+    cache_path = _feature_cache_path(bpm_str)
+    if _is_fresh(cache_path, audio_file):
+        return np.load(cache_path)
+
+    features = _mel_pipeline()(_load_audio(audio_file, bpm_str))
+    _save_cached_features(bpm_str, features)
+    return features
+
+
+def _mel_golden_one(audio_file: Path):
+    """Write the raw audio, binary features and JSON metadata for one file.
+
+    The feature values live only in the .bin file; the JSON describes it.
+    """
+    import librosa
+
+    bpm_str = audio_file.stem.split("_")[0]
+    print(f"  Processing: {audio_file.name}")
+
+    try:
+        # Load audio
+        audio, sr = librosa.load(str(audio_file), sr=SAMPLE_RATE, mono=True, res_type=RES_TYPE)
+
+        # Save raw audio for C++ (float32 little-endian)
+        # librosa already returns float32, so this is normally not a copy
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        raw_path = _raw_audio_path(bpm_str)
+        audio.tofile(raw_path)
+        print(f"    Saved raw audio: {raw_path}")
+
+        # Always recompute: the .bin must come from the same decode as the .raw
+        # the C++ side reads. Refresh the cache for the e2e stage while here.
+        features = _mel_pipeline()(audio)
+        _save_cached_features(bpm_str, features)
+
+        # Save first 100 frames for thorough comparison
+        num_frames = min(100, len(features))
+
+        # Save features as binary (float32) for easy C++ loading
+        # Format: [num_frames (int32), feature_dim (int32), features (float32 array)]
+        feat32 = np.ascontiguousarray(features[:num_frames], dtype=np.float32)
+        binary_path = GOLDEN_DIR / f"mel_golden_{bpm_str}bpm.bin"
+        with open(binary_path, "wb") as bf:
+            np.array([num_frames, feat32.shape[1]], dtype=np.int32).tofile(bf)
+            feat32.tofile(bf)
+        print(f"    Saved binary features: {binary_path}")
+
+        data = {
+            "description": f"Mel spectrogram golden from madmom for {audio_file.name}",
+            "audio_file": audio_file.name,
+            "raw_audio_file": f"{bpm_str}.raw",
+            "binary_features_file": f"mel_golden_{bpm_str}bpm.bin",
+            "config": {
+                "sample_rate": SAMPLE_RATE,
+                "resampler": RES_TYPE,
+                "hop_size": HOP_SIZE,
+                "win_length": FFT_SIZE,
+                "bands_per_octave": NUM_BANDS,
+                "fmin": 30,
+                "fmax": 17000,
+            },
+            "feature_dim": int(features.shape[1]) if len(features) > 0 else 0,
+            "total_frames": len(features),
+            "golden_frames": num_frames,
+        }
+
+        save_json(data, f"mel_golden_{bpm_str}bpm.json")
+
+    except Exception as e:
+        import traceback
+        print(f"    Error: {e}")
+        traceback.print_exc()
+
+
 def generate_mel_golden():
     """Generate mel spectrogram features using madmom, matching BeatNet's log_spect.py exactly."""
     print("\n=== Generating Mel Spectrogram Golden Files ===")
 
     try:
         import librosa
-        from madmom.audio.signal import SignalProcessor, FramedSignalProcessor
-        from madmom.audio.stft import ShortTimeFourierTransformProcessor
-        from madmom.audio.spectrogram import (
-            FilteredSpectrogramProcessor,
-            LogarithmicSpectrogramProcessor,
-            SpectrogramDifferenceProcessor,
-        )
-        from madmom.processors import SequentialProcessor
+        import madmom
     except ImportError as e:
         print(f"  ERROR: {e}")
         print("  Install with: pip install librosa madmom")
         return
 
-    # BeatNet configuration (from BeatNet.py)
-    sample_rate = SAMPLE_RATE
-    hop_size = HOP_SIZE
-    win_length = FFT_SIZE
-    num_bands = NUM_BANDS
-
     # Find test audio files - use all of them
     audio_files = sorted(AUDIO_DIR.glob("*.m4a"))
 
@@ -178,83 +422,111 @@ def generate_mel_golden():
         return
 
     # Also save raw audio for C++ tests
-    raw_audio_dir = GOLDEN_DIR.parent / "audio"
-    raw_audio_dir.mkdir(parents=True, exist_ok=True)
-
-    for audio_file in audio_files:
-        bpm_str = audio_file.stem.split("_")[0]
-        print(f"  Processing: {audio_file.name}")
-
-        try:
-            # Load audio
-            audio, sr = librosa.load(str(audio_file), sr=sample_rate, mono=True)
-
-            # Save raw audio for C++ (float32 little-endian)
-            raw_path = raw_audio_dir / f"{bpm_str}.raw"
-            audio.astype(np.float32).tofile(raw_path)
-            print(f"    Saved raw audio: {raw_path}")
-
-            # Create exact BeatNet pipeline from log_spect.py
-            sig = SignalProcessor(num_channels=1, sample_rate=sample_rate)
-            frames = FramedSignalProcessor(frame_size=win_length, hop_size=hop_size)
-            stft = ShortTimeFourierTransformProcessor()
-            filt = FilteredSpectrogramProcessor(
-                num_bands=num_bands, fmin=30, fmax=17000, norm_filters=True
-            )
-            spec = LogarithmicSpectrogramProcessor(mul=1, add=1)
-            diff = SpectrogramDifferenceProcessor(
-                diff_ratio=0.5, positive_diffs=True, stack_diffs=np.hstack
-            )
-
-            pipe = SequentialProcessor([sig, frames, stft, filt, spec, diff])
-            features = pipe(audio)
-
-            # Save first 100 frames for thorough comparison
-            num_frames = min(100, len(features))
-
-            # Save features as binary (float32) for easy C++ loading
-            # Format: [num_frames (int32), feature_dim (int32), features (float32 array)]
-            binary_path = GOLDEN_DIR / f"mel_golden_{bpm_str}bpm.bin"
-            with open(binary_path, "wb") as bf:
-                np.array([num_frames], dtype=np.int32).tofile(bf)
-                np.array([features.shape[1]], dtype=np.int32).tofile(bf)
-                features[:num_frames].astype(np.float32).tofile(bf)
-            print(f"    Saved binary features: {binary_path}")
-
-            data = {
-                "description": f"Mel spectrogram golden from madmom for {audio_file.name}",
-                "audio_file": audio_file.name,
-                "raw_audio_file": f"{bpm_str}.raw",
-                "binary_features_file": f"mel_golden_{bpm_str}bpm.bin",
-                "config": {
-                    "sample_rate": sample_rate,
-                    "hop_size": hop_size,
-                    "win_length": win_length,
-                    "bands_per_octave": num_bands,
-                    "fmin": 30,
-                    "fmax": 17000,
-                },
-                "feature_dim": int(features.shape[1]) if len(features) > 0 else 0,
-                "total_frames": len(features),
-                "frames": [
-                    {
-                        "index": i,
-                        "features": features[i].tolist(),
-                    }
-                    for i in range(num_frames)
-                ],
-            }
+    (GOLDEN_DIR.parent / "audio").mkdir(parents=True, exist_ok=True)
+
+    # Files are independent, so spread them across cores
+    with _process_pool(len(audio_files)) as pool:
+        list(pool.map(_mel_golden_one, audio_files))
+
 
-            save_json(data, f"mel_golden_{bpm_str}bpm.json")
+def run_beatnet(session, features: np.ndarray) -> np.ndarray:
+    """Run BeatNet over all frames, returning raw [num_frames, 3] model outputs.
 
-        except Exception as e:
-            import traceback
-            print(f"    Error: {e}")
-            traceback.print_exc()
+    The streaming model (seq fixed at 1) is stepped frame by frame through
+    IOBinding, carrying the LSTM state between frames.
+    """
+    import onnxruntime as ort
 
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    num_frames, feature_dim = features.shape
 
-def generate_onnx_golden():
-    """Generate ONNX model outputs for test audio files."""
+    # Inputs: input, hidden_in, cell_in. Outputs: output, hidden_out, cell_out
+    input_name, hidden_in_name, cell_in_name = [i.name for i in session.get_inputs()]
+    output_name, hidden_out_name, cell_out_name = [o.name for o in session.get_outputs()]
+
+    # Pre-allocated buffers shared with ORT through IOBinding, so each frame
+    # runs without building feed dicts or allocating outputs.
+    # Input: [batch=1, seq=1, features=272], model output: [1, 1, 3]
+    frame_input = np.zeros((1, 1, feature_dim), dtype=np.float32)
+    model_output = np.zeros((1, 1, 3), dtype=np.float32)
+    frame_value = ort.OrtValue.ortvalue_from_numpy(frame_input)
+    output_value = ort.OrtValue.ortvalue_from_numpy(model_output)
+
+    # LSTM hidden/cell state [2, 1, 150], double-buffered: each frame reads
+    # one buffer and writes the other, then the bindings swap.
+    hidden = [ort.OrtValue.ortvalue_from_numpy(np.zeros((2, 1, 150), dtype=np.float32)) for _ in range(2)]
+    cell = [ort.OrtValue.ortvalue_from_numpy(np.zeros((2, 1, 150), dtype=np.float32)) for _ in range(2)]
+
+    io_binding = session.io_binding()
+    io_binding.bind_ortvalue_input(input_name, frame_value)
+    io_binding.bind_ortvalue_output(output_name, output_value)
+
+    raw_outputs = np.empty((num_frames, 3), dtype=np.float32)
+    for i in range(num_frames):
+        np.copyto(frame_input[0], features[i:i+1, :])
+
+        src, dst = i % 2, (i + 1) % 2
+        io_binding.bind_ortvalue_input(hidden_in_name, hidden[src])
+        io_binding.bind_ortvalue_input(cell_in_name, cell[src])
+        io_binding.bind_ortvalue_output(hidden_out_name, hidden[dst])
+        io_binding.bind_ortvalue_output(cell_out_name, cell[dst])
+
+        session.run_with_iobinding(io_binding)
+        raw_outputs[i] = model_output.reshape(3)
+
+    return raw_outputs
+
+
+def beatnet_activations(raw_outputs: np.ndarray) -> np.ndarray:
+    """Convert raw [num_frames, 3] outputs to [num_frames, 2] beat/downbeat activations."""
+    from scipy.special import softmax
+
+    # Apply softmax only to frames that are not already normalized: the
+    # exported models end in a softmax, so the raw outputs are usually
+    # probabilities already and must not be squashed a second time.
+    needs_softmax = np.abs(raw_outputs.sum(axis=1) - 1.0) > 0.01
+    probs = np.where(needs_softmax[:, np.newaxis], softmax(raw_outputs, axis=1), raw_outputs)
+
+    # Output order: [beat, downbeat, non-beat]
+    return probs[:, :2].astype(np.float32)
+
+
+def _onnx_golden_one(mel_file: Path):
+    """Run BeatNet over one mel golden file and save its activations."""
+    bpm_str = mel_file.stem.replace("mel_golden_", "").replace("bpm", "")
+    print(f"  Processing: {mel_file.name}")
+
+    # Load mel features
+    with open(mel_file, "rb") as f:
+        num_frames = np.frombuffer(f.read(4), dtype=np.int32)[0]
+        feature_dim = np.frombuffer(f.read(4), dtype=np.int32)[0]
+        features = np.frombuffer(f.read(), dtype=np.float32).reshape(num_frames, feature_dim)
+
+    print(f"    Loaded {num_frames} frames, {feature_dim} features")
+
+    print(f"    Execution provider: {_worker_session.get_providers()[0]}")
+
+    # Run inference frame by frame
+    raw_outputs = run_beatnet(_worker_session, features)
+
+    activations = beatnet_activations(raw_outputs)
+
+    # Save as binary: [num_frames (int32), activations (float32 array)]
+    binary_path = GOLDEN_DIR / f"onnx_activations_{bpm_str}bpm.bin"
+    with open(binary_path, "wb") as f:
+        np.array([num_frames], dtype=np.int32).tofile(f)
+        activations.tofile(f)
+
+    print(f"    Saved: {binary_path}")
+    print(f"    Beat activation range: [{activations[:, 0].min():.4f}, {activations[:, 0].max():.4f}]")
+    print(f"    Downbeat activation range: [{activations[:, 1].min():.4f}, {activations[:, 1].max():.4f}]")
+
+
+def generate_onnx_golden(pool=None):
+    """Generate ONNX model outputs for test audio files.
+
+    pool: optional beatnet_pool() to run on; a private one is created otherwise.
+    """
     print("\n=== Generating ONNX Model Golden Files ===")
 
     try:
@@ -266,220 +538,143 @@ def generate_onnx_golden():
         return
 
     # Find the ONNX model
-    model_path = PROJECT_ROOT / "apps/native/assets/models/beatnet_model_2.onnx"
-    if not model_path.exists():
-        print(f"  ERROR: Model not found at {model_path}")
+    if not BEATNET_MODEL_PATH.exists():
+        print(f"  ERROR: Model not found at {BEATNET_MODEL_PATH}")
         return
 
-    print(f"  Loading model: {model_path}")
-
-    # Create ONNX Runtime session
-    session = ort.InferenceSession(str(model_path))
-
-    # Get input/output names
-    input_names = [i.name for i in session.get_inputs()]
-    output_names = [o.name for o in session.get_outputs()]
-    print(f"  Inputs: {input_names}")
-    print(f"  Outputs: {output_names}")
+    print(f"  Loading model: {BEATNET_MODEL_PATH}")
 
     # Process each mel golden file
     mel_files = sorted(GOLDEN_DIR.glob("mel_golden_*bpm.bin"))
+    if not mel_files:
+        return
+
+    with nullcontext(pool) if pool else beatnet_pool(len(mel_files)) as pool:
+        list(pool.map(_onnx_golden_one, mel_files))
 
-    for mel_file in mel_files:
-        bpm_str = mel_file.stem.replace("mel_golden_", "").replace("bpm", "")
-        print(f"  Processing: {mel_file.name}")
 
-        # Load mel features
-        with open(mel_file, "rb") as f:
-            num_frames = np.frombuffer(f.read(4), dtype=np.int32)[0]
-            feature_dim = np.frombuffer(f.read(4), dtype=np.int32)[0]
-            features = np.frombuffer(f.read(), dtype=np.float32).reshape(num_frames, feature_dim)
+def _e2e_golden_one(audio_file: Path):
+    """Run audio → mel → ONNX → particle filter for one file.
 
-        print(f"    Loaded {num_frames} frames, {feature_dim} features")
+    Returns the e2e result entry, or None if processing failed.
+    """
+    from BeatNet.particle_filtering_cascade import particle_filter_cascade
 
-        # Initialize LSTM hidden state
-        hidden = np.zeros((2, 1, 150), dtype=np.float32)
-        cell = np.zeros((2, 1, 150), dtype=np.float32)
+    bpm_str = audio_file.stem.split("_")[0]
+    expected_bpm = float(bpm_str)
+    print(f"  Processing: {audio_file.name} (expected BPM: {expected_bpm})")
 
-        # Run inference frame by frame
-        activations = []
-        for i in range(num_frames):
-            # Prepare input: [batch=1, seq=1, features=272]
-            frame_input = features[i:i+1, :].reshape(1, 1, feature_dim).astype(np.float32)
+    try:
+        # Extract mel features (cached by the mel stage when it ran first)
+        features = _load_or_compute_features(audio_file, bpm_str)
+        num_frames = len(features)
+        print(f"    Extracted {num_frames} mel frames")
+
+        # Run ONNX inference
+        raw_outputs = run_beatnet(_worker_session, features)
+
+        # The particle filter gets float64, as in BeatNet: it overwrites low
+        # activations with 0.03, which float32 would round away from the
+        # exact 0.03 its non-beat states use.
+        activations = beatnet_activations(raw_outputs).astype(np.float64)
+
+        # Run particle filter
+        np.random.seed(1)
+        pf = particle_filter_cascade(
+            particle_size=2500,
+            down_particle_size=400,
+            min_bpm=55.0,
+            max_bpm=215.0,
+            num_tempi=300,
+            fps=50,
+            plot=[],
+            mode=None,
+        )
 
-            # Run inference
-            outputs = session.run(
-                output_names,
+        # Record detections into preallocated arrays; dicts are only built
+        # for the beats that end up in the golden file.
+        beat_frames = np.empty(num_frames, dtype=np.int32)
+        beat_types = np.empty(num_frames, dtype=np.int32)
+        num_beats = 0
+        for i, act in enumerate(activations):
+            result = pf.process(np.array([act]))
+            if result is not None and len(result) > 0:
+                beat_frames[num_beats] = i
+                beat_types[num_beats] = int(result[0][1]) if len(result[0]) > 1 else 1
+                num_beats += 1
+
+        beat_times = beat_frames[:num_beats] / 50.0
+
+        # Get final BPM
+        final_interval = np.median(pf.st.state_intervals[pf.particles])
+        final_bpm = 60.0 * 50.0 / final_interval
+
+        print(f"    Detected BPM: {final_bpm:.2f} (expected: {expected_bpm})")
+        print(f"    Beats detected: {num_beats}")
+
+        return {
+            "audio_file": audio_file.name,
+            "expected_bpm": expected_bpm,
+            "detected_bpm": float(final_bpm),
+            "bpm_error": abs(final_bpm - expected_bpm),
+            "num_frames": num_frames,
+            "num_beats": num_beats,
+            "execution_provider": _worker_session.get_providers()[0],
+            "beats": [  # First 50 beats
                 {
-                    "input": frame_input,
-                    "hidden_in": hidden,
-                    "cell_in": cell,
+                    "frame": int(beat_frames[k]),
+                    "time": float(beat_times[k]),
+                    "type": int(beat_types[k]),
                 }
-            )
-
-            # outputs[0] = model output [1, 1, 3]
-            # outputs[1] = hidden_out [2, 1, 150]
-            # outputs[2] = cell_out [2, 1, 150]
-            output = outputs[0].reshape(3)
-            hidden = outputs[1]
-            cell = outputs[2]
-
-            # Apply softmax if not already normalized
-            if abs(output.sum() - 1.0) > 0.01:
-                exp_output = np.exp(output - output.max())
-                output = exp_output / exp_output.sum()
-
-            # Output order: [beat, downbeat, non-beat]
-            beat_activation = float(output[0])
-            downbeat_activation = float(output[1])
-
-            activations.append([beat_activation, downbeat_activation])
-
-        activations = np.array(activations, dtype=np.float32)
+                for k in range(min(50, num_beats))
+            ],
+        }
 
-        # Save as binary: [num_frames (int32), activations (float32 array)]
-        binary_path = GOLDEN_DIR / f"onnx_activations_{bpm_str}bpm.bin"
-        with open(binary_path, "wb") as f:
-            np.array([num_frames], dtype=np.int32).tofile(f)
-            activations.tofile(f)
+    except Exception as e:
+        import traceback
+        print(f"    Error: {e}")
+        traceback.print_exc()
+        return None
 
-        print(f"    Saved: {binary_path}")
-        print(f"    Beat activation range: [{activations[:, 0].min():.4f}, {activations[:, 0].max():.4f}]")
-        print(f"    Downbeat activation range: [{activations[:, 1].min():.4f}, {activations[:, 1].max():.4f}]")
 
+def generate_e2e_golden(pool=None):
+    """Generate end-to-end golden files: audio → features → activations → BPM.
 
-def generate_e2e_golden():
-    """Generate end-to-end golden files: audio → features → activations → BPM."""
+    pool: optional beatnet_pool() to run on; a private one is created otherwise.
+    """
     print("\n=== Generating E2E Golden Files ===")
 
     try:
         import torch
         import onnxruntime as ort
         import librosa
-        from madmom.audio.signal import SignalProcessor, FramedSignalProcessor
-        from madmom.audio.stft import ShortTimeFourierTransformProcessor
-        from madmom.audio.spectrogram import (
-            FilteredSpectrogramProcessor,
-            LogarithmicSpectrogramProcessor,
-            SpectrogramDifferenceProcessor,
-        )
-        from madmom.processors import SequentialProcessor
+        import madmom
         from BeatNet.particle_filtering_cascade import particle_filter_cascade
     except ImportError as e:
         print(f"  ERROR: {e}")
         return
 
     # Find the ONNX model
-    model_path = PROJECT_ROOT / "apps/native/assets/models/beatnet_model_2.onnx"
-    if not model_path.exists():
-        print(f"  ERROR: Model not found at {model_path}")
+    if not BEATNET_MODEL_PATH.exists():
+        print(f"  ERROR: Model not found at {BEATNET_MODEL_PATH}")
         return
 
-    # Create ONNX session
-    session = ort.InferenceSession(str(model_path))
-    input_names = [i.name for i in session.get_inputs()]
-    output_names = [o.name for o in session.get_outputs()]
-
-    # Create mel pipeline
-    sig = SignalProcessor(num_channels=1, sample_rate=SAMPLE_RATE)
-    frames = FramedSignalProcessor(frame_size=FFT_SIZE, hop_size=HOP_SIZE)
-    stft = ShortTimeFourierTransformProcessor()
-    filt = FilteredSpectrogramProcessor(num_bands=NUM_BANDS, fmin=30, fmax=17000, norm_filters=True)
-    spec = LogarithmicSpectrogramProcessor(mul=1, add=1)
-    diff = SpectrogramDifferenceProcessor(diff_ratio=0.5, positive_diffs=True, stack_diffs=np.hstack)
-    mel_pipeline = SequentialProcessor([sig, frames, stft, filt, spec, diff])
-
-    # Process each audio file
+    # Process each audio file, one per worker
     audio_files = sorted(AUDIO_DIR.glob("*.m4a"))
     e2e_results = {}
 
-    for audio_file in audio_files:
-        bpm_str = audio_file.stem.split("_")[0]
-        expected_bpm = float(bpm_str)
-        print(f"  Processing: {audio_file.name} (expected BPM: {expected_bpm})")
-
-        try:
-            # Load audio
-            audio, sr = librosa.load(str(audio_file), sr=SAMPLE_RATE, mono=True)
-
-            # Extract mel features
-            features = mel_pipeline(audio)
-            num_frames = len(features)
-            print(f"    Extracted {num_frames} mel frames")
-
-            # Run ONNX inference
-            hidden = np.zeros((2, 1, 150), dtype=np.float32)
-            cell = np.zeros((2, 1, 150), dtype=np.float32)
-            activations = []
-
-            for i in range(num_frames):
-                frame_input = features[i:i+1, :].reshape(1, 1, 272).astype(np.float32)
-                outputs = session.run(
-                    output_names,
-                    {"input": frame_input, "hidden_in": hidden, "cell_in": cell}
-                )
-                output = outputs[0].reshape(3)
-                hidden = outputs[1]
-                cell = outputs[2]
-
-                if abs(output.sum() - 1.0) > 0.01:
-                    exp_output = np.exp(output - output.max())
-                    output = exp_output / exp_output.sum()
-
-                activations.append([float(output[0]), float(output[1])])
-
-            activations = np.array(activations)
-
-            # Run particle filter
-            np.random.seed(1)
-            pf = particle_filter_cascade(
-                particle_size=2500,
-                down_particle_size=400,
-                min_bpm=55.0,
-                max_bpm=215.0,
-                num_tempi=300,
-                fps=50,
-                plot=[],
-                mode=None,
-            )
-
-            beats_detected = []
-            for i, act in enumerate(activations):
-                result = pf.process(np.array([act]))
-                if result is not None and len(result) > 0:
-                    beats_detected.append({
-                        "frame": i,
-                        "time": i / 50.0,
-                        "type": int(result[0][1]) if len(result[0]) > 1 else 1
-                    })
-
-            # Get final BPM
-            final_interval = np.median(pf.st.state_intervals[pf.particles])
-            final_bpm = 60.0 * 50.0 / final_interval
-
-            print(f"    Detected BPM: {final_bpm:.2f} (expected: {expected_bpm})")
-            print(f"    Beats detected: {len(beats_detected)}")
-
-            e2e_results[bpm_str] = {
-                "audio_file": audio_file.name,
-                "expected_bpm": expected_bpm,
-                "detected_bpm": float(final_bpm),
-                "bpm_error": abs(final_bpm - expected_bpm),
-                "num_frames": num_frames,
-                "num_beats": len(beats_detected),
-                "beats": beats_detected[:50],  # First 50 beats
-            }
-
-        except Exception as e:
-            import traceback
-            print(f"    Error: {e}")
-            traceback.print_exc()
+    if audio_files:
+        with nullcontext(pool) if pool else beatnet_pool(len(audio_files)) as pool:
+            for audio_file, result in zip(audio_files, pool.map(_e2e_golden_one, audio_files)):
+                if result is not None:
+                    e2e_results[audio_file.stem.split("_")[0]] = result
 
     # Save e2e results
     save_json({
         "description": "End-to-end golden results: audio → mel → ONNX → particle filter → BPM",
         "config": {
             "sample_rate": SAMPLE_RATE,
+            "resampler": RES_TYPE,
             "hop_size": HOP_SIZE,
             "fft_size": FFT_SIZE,
             "fps": 50,
@@ -488,6 +683,33 @@ def generate_e2e_golden():
     }, "e2e_golden.json")
 
 
+def _fast_median(a: np.ndarray):
+    """Median via quickselect, without np.median's generic reduction overhead.
+
+    Even-length inputs average the two middle elements, exactly like np.median.
+    """
+    k = a.size // 2
+    if a.size % 2:
+        return np.partition(a, k)[k]
+    part = np.partition(a, (k - 1, k))
+    return (part[k - 1] + part[k]) / 2
+
+
+def _synthetic_activations(num_frames: int, frames_per_beat: int) -> np.ndarray:
+    """Build [num_frames, 2] beat/downbeat activations for a steady tempo.
+
+    float64, matching the Python floats the golden was first generated from.
+    """
+    i = np.arange(num_frames)
+    phase = (i % frames_per_beat) / frames_per_beat
+    is_beat = phase < 0.1
+    is_downbeat = is_beat & ((i % (frames_per_beat * 4)) < 3)
+
+    beat_act = np.where(is_beat, 0.9, 0.1)
+    down_act = np.where(is_downbeat, 0.85, np.where(is_beat, 0.3, 0.1))
+    return np.stack([beat_act, down_act], axis=1)
+
+
 def generate_particle_filter_golden():
     """Generate particle filter golden files from Python BeatNet."""
     print("\n=== Generating Particle Filter Golden Files ===")
@@ -523,8 +745,8 @@ def generate_particle_filter_golden():
     )
 
     # Capture initial state
-    initial_particles = pf.particles.copy().tolist()
-    initial_down_particles = pf.down_particles.copy().tolist()
+    initial_particles = pf.particles.copy()
+    initial_down_particles = pf.down_particles.copy()
 
     # Test case 1: Constant 120 BPM activations
     # At 50 FPS, 120 BPM = 25 frames per beat
@@ -533,17 +755,7 @@ def generate_particle_filter_golden():
     frames_per_beat = int(60.0 / target_bpm * fps)  # 25
     num_frames = 500  # 10 seconds
 
-    activations = []
-    for i in range(num_frames):
-        phase = (i % frames_per_beat) / frames_per_beat
-        is_beat = phase < 0.1
-        is_downbeat = is_beat and (i % (frames_per_beat * 4)) < 3
-
-        beat_act = 0.9 if is_beat else 0.1
-        down_act = 0.85 if is_downbeat else (0.3 if is_beat else 0.1)
-        activations.append([beat_act, down_act])
-
-    activations_np = np.array(activations)
+    acts = _synthetic_activations(num_frames, frames_per_beat)
 
     # Process and capture frame-by-frame results
     # Reset seed again for reproducibility
@@ -562,19 +774,19 @@ def generate_particle_filter_golden():
     )
 
     frame_results = []
-    for i, act in enumerate(activations):
-        # Process single frame
-        result = pf2.process(np.array([act]))
+    for i in range(num_frames):
+        # Process single frame (a view; the filter copies what it keeps)
+        result = pf2.process(acts[i:i+1])
 
         # Capture state after this frame
-        median_particle = np.median(pf2.st.state_positions[pf2.particles])
-        median_interval = np.median(pf2.st.state_intervals[pf2.particles])
+        median_particle = _fast_median(pf2.st.state_positions[pf2.particles])
+        median_interval = _fast_median(pf2.st.state_intervals[pf2.particles])
         bpm = 60.0 * fps / median_interval if median_interval > 0 else 0
 
         frame_results.append({
             "frame": i,
-            "beat_activation": act[0],
-            "downbeat_activation": act[1],
+            "beat_activation": float(acts[i, 0]),
+            "downbeat_activation": float(acts[i, 1]),
             "median_phase": float(median_particle),
             "median_interval": float(median_interval),
             "estimated_bpm": float(bpm),
@@ -582,7 +794,7 @@ def generate_particle_filter_golden():
         })
 
     # Get final BPM
-    final_median_interval = np.median(pf2.st.state_intervals[pf2.particles])
+    final_median_interval = _fast_median(pf2.st.state_intervals[pf2.particles])
     final_bpm = 60.0 * fps / final_median_interval
 
     data = {
@@ -611,28 +823,111 @@ def generate_particle_filter_golden():
             "constant_120bpm": {
                 "target_bpm": target_bpm,
                 "num_frames": num_frames,
-                "activations": activations,
+                "activations": acts,
                 "final_bpm": float(final_bpm),
                 "frame_results": frame_results,
             }
         }
     }
 
-    save_json(data, "particle_filter_golden.json")
+    save_json(data, "particle_filter_golden.json", indent=True)
     print(f"  Final BPM for 120 BPM input: {final_bpm:.2f}")
 
 
+STAGES = ("fft", "filterbank", "mel", "onnx", "particle_filter", "e2e")
+
+
+def _stage_files(name: str):
+    """Return (outputs, inputs) paths for a stage, used for freshness checks."""
+    audio_files = sorted(AUDIO_DIR.glob("*.m4a"))
+    bpms = [f.stem.split("_")[0] for f in audio_files]
+
+    if name == "fft":
+        return [GOLDEN_DIR / "fft_golden.json"], []
+    if name == "filterbank":
+        return [GOLDEN_DIR / "filterbank.bin"], []
+    if name == "mel":
+        outputs = []
+        for bpm in bpms:
+            outputs += [
+                GOLDEN_DIR / f"mel_golden_{bpm}bpm.bin",
+                GOLDEN_DIR / f"mel_golden_{bpm}bpm.json",
+            ]
+        return outputs, audio_files
+    if name == "onnx":
+        mel_files = sorted(GOLDEN_DIR.glob("mel_golden_*bpm.bin"))
+        outputs = [
+            GOLDEN_DIR / f.name.replace("mel_golden_", "onnx_activations_")
+            for f in mel_files
+        ]
+        return outputs, mel_files + [BEATNET_MODEL_PATH]
+    if name == "particle_filter":
+        return [GOLDEN_DIR / "particle_filter_golden.json"], []
+    if name == "e2e":
+        return [GOLDEN_DIR / "e2e_golden.json"], audio_files + [BEATNET_MODEL_PATH]
+    raise ValueError(f"Unknown stage: {name}")
+
+
+def _outputs_exist_and_fresh(name: str) -> bool:
+    """True if every output of a stage exists and is newer than its inputs."""
+    outputs, inputs = _stage_files(name)
+    if not outputs or not all(p.exists() for p in outputs):
+        return False
+
+    # The script itself is an input of every stage
+    inputs = [Path(__file__)] + [p for p in inputs if p.exists()]
+    oldest_output = min(p.stat().st_mtime for p in outputs)
+    newest_input = max(p.stat().st_mtime for p in inputs)
+    return oldest_output >= newest_input
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate golden files for C++ unit tests")
+    parser.add_argument(
+        "--only",
+        type=lambda s: set(s.split(",")),
+        default=None,
+        help=f"comma-separated stages to run (from: {', '.join(STAGES)})",
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="skip stages whose outputs are newer than their inputs",
+    )
+    parser.add_argument(
+        "--force-rebuild",
+        action="store_true",
+        help="discard cached mel features and recompute them from audio",
+    )
+    args = parser.parse_args()
+
+    if args.only and not args.only <= set(STAGES):
+        parser.error(f"unknown stage(s): {', '.join(sorted(args.only - set(STAGES)))}")
+
     print("=" * 60)
     print("Generating Golden Files for C++ Unit Tests")
     print("=" * 60)
 
-    generate_fft_golden()
-    generate_filterbank_golden()
-    generate_mel_golden()
-    generate_onnx_golden()
-    generate_particle_filter_golden()
-    generate_e2e_golden()
+    if args.force_rebuild and FEATURE_CACHE_DIR.exists():
+        shutil.rmtree(FEATURE_CACHE_DIR)
+
+    # One pool for both ONNX stages, so each worker loads the model once
+    with beatnet_pool(len(list(AUDIO_DIR.glob("*.m4a")))) as pool:
+        stages = {
+            "fft": generate_fft_golden,
+            "filterbank": generate_filterbank_golden,
+            "mel": generate_mel_golden,
+            "onnx": functools.partial(generate_onnx_golden, pool),
+            "particle_filter": generate_particle_filter_golden,
+            "e2e": functools.partial(generate_e2e_golden, pool),
+        }
+        for name, generate in stages.items():
+            if args.only and name not in args.only:
+                continue
+            if args.skip_existing and _outputs_exist_and_fresh(name):
+                print(f"\n=== Skipping {name}: outputs are up to date ===")
+                continue
+            generate()
 
     print("\n" + "=" * 60)
     print("Done!")